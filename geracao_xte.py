@@ -0,0 +1,379 @@
+"""Geração dos arquivos XTE/XML (TISS Monitoramento) a partir de planilhas Excel/CSV."""
+import xml.etree.ElementTree as ET
+import hashlib
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+CHAVES_GUIA = ["numeroGuia_prestador", "numeroGuia_operadora", "identificacaoReembolso"]
+
+# Colunas da planilha lidas por gerar_xte_do_excel; só estas são copiadas na ordenação das guias
+COLUNAS_GERACAO = ["Nome da Origem"] + CHAVES_GUIA + [
+    "numeroLote", "competenciaLote", "registroANS", "versaoPadrao",
+    "tipoRegistro", "versaoTISSPrestador", "formaEnvio", "CNES", "identificadorExecutante",
+    "codigoCNPJ_CPF", "municipioExecutante", "registroANSOperadoraIntermediaria",
+    "tipoAtendimentoOperadoraIntermediaria", "numeroCartaoNacionalSaude", "cpfBeneficiario", "sexo",
+    "dataNascimento", "municipioResidencia", "numeroRegistroPlano", "tipoEventoAtencao",
+    "origemEventoAtencao", "identificacaoValorPreestabelecido", "formaRemuneracao", "valorRemuneracao",
+    "guiaSolicitacaoInternacao", "dataSolicitacao", "numeroGuiaSPSADTPrincipal", "dataAutorizacao",
+    "dataRealizacao", "dataInicialFaturamento", "dataFimPeriodo", "dataProtocoloCobranca",
+    "dataPagamento", "dataProcessamentoGuia", "tipoConsulta", "cboExecutante", "indicacaoRecemNato",
+    "indicacaoAcidente", "caraterAtendimento", "tipoInternacao", "regimeInternacao", "diagnosticoCID",
+    "tipoAtendimento", "regimeAtendimento", "saudeOcupacional", "tipoFaturamento", "diariasAcompanhante",
+    "diariasUTI", "motivoSaida", "valorTotalInformado", "valorProcessado", "valorTotalPagoProcedimentos",
+    "valorTotalDiarias", "valorTotalTaxas", "valorTotalMateriais", "valorTotalOPME",
+    "valorTotalMedicamentos", "valorGlosaGuia", "valorPagoGuia", "valorPagoFornecedores",
+    "valorTotalTabelaPropria", "valorTotalCoParticipacao", "declaracaoNascido", "declaracaoObito",
+    "codigoTabela", "grupoProcedimento", "codigoProcedimento", "quantidadeInformada", "valorInformado",
+    "quantidadePaga", "unidadeMedida", "valorPagoProc", "valorPagoFornecedor", "CNPJFornecedor",
+    "valorCoParticipacao",
+]
+
+
+class LinhaColunar:
+    """Acesso a uma linha das colunas agrupadas com a mesma interface de `Series.get`."""
+    __slots__ = ("colunas", "posicao")
+
+    def __init__(self, colunas, posicao):
+        self.colunas = colunas
+        self.posicao = posicao
+
+    def get(self, coluna, default=None):
+        valores = self.colunas.get(coluna)
+        if valores is None:
+            return default
+        return valores[self.posicao]
+
+
+def agrupar_guias(df, colunas_usadas=None):
+    """
+    Agrupa as linhas por origem e por guia com uma única ordenação.
+
+    Equivale a `groupby("Nome da Origem")` seguido de `groupby(CHAVES_GUIA, dropna=False)`,
+    mas sem criar sub-DataFrames: as linhas são ordenadas uma vez por (origem, chaves da guia)
+    e os grupos são devolvidos como intervalos [inicio, fim) sobre os arrays das colunas.
+
+    Retorna (colunas, origens), onde `colunas` é um dict {coluna: array ordenado} e `origens`
+    é uma lista de (nome_origem, posicao_cabecalho, [(inicio, fim), ...]).
+
+    As colunas "Nome da Origem" e CHAVES_GUIA devem existir em `df`. Cada coluna devolvida é uma
+    cópia ordenada; `colunas_usadas` limita a cópia às colunas que serão lidas (padrão: todas).
+    """
+    n = len(df)
+    if colunas_usadas is None:
+        colunas_usadas = df.columns
+    colunas_usadas = [col for col in colunas_usadas if col in df.columns]
+    if n == 0:
+        return {col: df[col].to_numpy(dtype=object) for col in colunas_usadas}, []
+
+    codigos = []
+    for coluna in ["Nome da Origem"] + CHAVES_GUIA:
+        # sort=True mantém a mesma ordem de grupos do groupby; NaN (-1) vai para o fim, como no dropna=False
+        cod, uniques = pd.factorize(df[coluna], sort=True)
+        codigos.append(np.where(cod < 0, len(uniques), cod))
+
+    # lexsort é estável e usa a última chave como primária: a ordem original é mantida dentro de cada guia
+    ordem = np.lexsort(codigos[::-1])
+    codigos_ordenados = np.vstack([cod[ordem] for cod in codigos])
+    colunas = {col: df[col].to_numpy(dtype=object)[ordem] for col in colunas_usadas}
+
+    # Origens vazias são descartadas, como no groupby padrão (dropna=True)
+    origem_nula = df["Nome da Origem"].isna().to_numpy()[ordem]
+
+    mudanca_guia = np.flatnonzero((codigos_ordenados[:, 1:] != codigos_ordenados[:, :-1]).any(axis=0)) + 1
+    mudanca_origem = np.flatnonzero(codigos_ordenados[0, 1:] != codigos_ordenados[0, :-1]) + 1
+    limites_guia = np.concatenate(([0], mudanca_guia, [n]))
+    limites_origem = np.concatenate(([0], mudanca_origem, [n]))
+
+    origens = []
+    for inicio_origem, fim_origem in zip(limites_origem[:-1], limites_origem[1:]):
+        if origem_nula[inicio_origem]:
+            continue
+        i = np.searchsorted(limites_guia, inicio_origem)
+        j = np.searchsorted(limites_guia, fim_origem)
+        guias = list(zip(limites_guia[i:j].tolist(), limites_guia[i + 1:j + 1].tolist()))
+        # O cabeçalho vem da primeira linha da origem na planilha (equivalente ao df_origem.iloc[0])
+        posicao_cabecalho = inicio_origem + int(np.argmin(ordem[inicio_origem:fim_origem]))
+        origens.append((df["Nome da Origem"].iat[ordem[inicio_origem]], posicao_cabecalho, guias))
+    return colunas, origens
+
+
+def gerar_xte_do_excel(excel_file):
+    import xml.dom.minidom as minidom # Só é necessário para o pretty-print; importado sob demanda
+
+    ns = "http://www.ans.gov.br/padroes/tiss/schemas"
+
+    # Obtém data/hora ATUAL no momento da geração
+    data_atual = datetime.now().strftime("%Y-%m-%d")
+    hora_atual = datetime.now().strftime("%H:%M:%S")
+
+    if hasattr(excel_file, 'name') and excel_file.name.endswith('.csv'): # Checa se tem o atributo 'name'
+        df = pd.read_csv(excel_file, dtype=str, sep=';')
+    else:
+        df = pd.read_excel(excel_file, dtype=str)
+
+    def formatar_data_iso(valor):
+        if pd.isna(valor):
+            return ""
+        if isinstance(valor, datetime): # Se já for datetime (improvável do Excel como str)
+            return valor.strftime("%Y-%m-%d")
+        valor_str = str(valor).strip()
+        if valor_str == "":
+            return ""
+        
+        # Tenta formatos comuns de data
+        for fmt in ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+            try:
+                parsed_datetime = datetime.strptime(valor_str, fmt)
+                return parsed_datetime.strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+        
+        # Tenta converter de número serial do Excel se for um número
+        try:
+            # Verifica se é um número (pode ser float com .0)
+            if valor_str.replace('.', '', 1).isdigit():
+                serial = float(valor_str)
+                # A data base do Excel é 30/12/1899 para números seriais
+                base_date = datetime(1899, 12, 30)
+                delta = pd.to_timedelta(serial, unit='D')
+                return (base_date + delta).strftime("%Y-%m-%d")
+        except ValueError:
+            pass # Não é um número serial válido ou float simples
+
+        return valor_str # Retorna o valor original se não conseguir parsear como data conhecida
+
+
+    def sub(parent, tag, value, is_date=False):
+        if is_date:
+            value = formatar_data_iso(value)
+        
+        text = "" if pd.isna(value) else str(value).strip()
+        
+        # Adiciona o elemento apenas se o texto não estiver vazio OU se a tag for obrigatória (lógica não implementada aqui)
+        # Para simplificar, vamos adicionar se text não for vazio. Se alguma tag vazia for obrigatória pelo schema,
+        # esta lógica pode precisar de ajuste para enviar tags vazias (ex: <ans:tag></ans:tag>)
+        if text: 
+            ET.SubElement(parent, f"ans:{tag}").text = text
+
+    def extrair_texto(elemento):
+        textos = []
+        if elemento.text:
+            textos.append(elemento.text.strip()) # Adicionado strip() aqui também
+        for filho in elemento:
+            textos.extend(extrair_texto(filho))
+            if filho.tail:
+                textos.append(filho.tail.strip()) # Adicionado strip() aqui também
+        return textos
+
+    arquivos_gerados = {}
+
+    if "Nome da Origem" not in df.columns:
+        raise ValueError("A coluna 'Nome da Origem' é obrigatória no Excel para gerar os arquivos.")
+
+    chaves_ausentes = [chave for chave in CHAVES_GUIA if chave not in df.columns]
+    if chaves_ausentes:
+        raise ValueError(f"As colunas {', '.join(chaves_ausentes)} são obrigatórias no Excel para agrupar as guias.")
+
+    # Ordena uma única vez por (origem, guia); cada guia é um intervalo de linhas, sem sub-DataFrames
+    colunas, origens = agrupar_guias(df, COLUNAS_GERACAO)
+
+    for nome_arquivo, posicao_cabecalho, guias_origem in origens:
+        root = ET.Element("ans:mensagemEnvioANS", attrib={
+            "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
+            "xmlns:xsd": "http://www.w3.org/2001/XMLSchema",
+            "xsi:schemaLocation": f"{ns} {ns}/tissMonitoramentoV1_04_01.xsd", # Hardcoded para a versão correta
+            "xmlns:ans": ns
+        })
+
+        cabecalho = ET.SubElement(root, "ans:cabecalho")
+        linha_cabecalho = LinhaColunar(colunas, posicao_cabecalho) # Primeira linha da origem para dados do cabeçalho do lote/arquivo
+
+        identificacaoTransacao = ET.SubElement(cabecalho, "ans:identificacaoTransacao")
+        sub(identificacaoTransacao, "tipoTransacao", "MONITORAMENTO") # Conforme TISS Monitoramento
+        sub(identificacaoTransacao, "numeroLote", linha_cabecalho.get("numeroLote"))
+        sub(identificacaoTransacao, "competenciaLote", linha_cabecalho.get("competenciaLote"))
+        sub(identificacaoTransacao, "dataRegistroTransacao", data_atual)  # Usa data atual da geração
+        sub(identificacaoTransacao, "horaRegistroTransacao", hora_atual)  # Usa hora atual da geração
+
+        sub(cabecalho, "registroANS", linha_cabecalho.get("registroANS"))
+        sub(cabecalho, "versaoPadrao", linha_cabecalho.get("versaoPadrao", "1.04.01")) # Default para a versão do schema
+
+        mensagem = ET.SubElement(root, "ans:Mensagem")
+        op_ans = ET.SubElement(mensagem, "ans:operadoraParaANS")
+
+        for inicio_guia, fim_guia in guias_origem: # Iterando sobre cada intervalo que representa uma guia
+            guia = ET.SubElement(op_ans, "ans:guiaMonitoramento")
+            # linha_guia representa os dados principais da guia (primeira linha do agrupamento)
+            linha_guia = LinhaColunar(colunas, inicio_guia)
+
+            # Sequência de acordo com ct_monitoramentoGuia do XSD tissMonitoramentoV1_04_01.xsd
+            sub(guia, "tipoRegistro", linha_guia.get("tipoRegistro"))
+            sub(guia, "versaoTISSPrestador", linha_guia.get("versaoTISSPrestador"))
+            sub(guia, "formaEnvio", linha_guia.get("formaEnvio"))
+
+            dadosContratadoExecutante_el = ET.SubElement(guia, "ans:dadosContratadoExecutante")
+            sub(dadosContratadoExecutante_el, "CNES", linha_guia.get("CNES"))
+            sub(dadosContratadoExecutante_el, "identificadorExecutante", linha_guia.get("identificadorExecutante"))
+            sub(dadosContratadoExecutante_el, "codigoCNPJ_CPF", linha_guia.get("codigoCNPJ_CPF"))
+            sub(dadosContratadoExecutante_el, "municipioExecutante", linha_guia.get("municipioExecutante"))
+
+            sub(guia, "registroANSOperadoraIntermediaria", linha_guia.get("registroANSOperadoraIntermediaria"))
+            sub(guia, "tipoAtendimentoOperadoraIntermediaria", linha_guia.get("tipoAtendimentoOperadoraIntermediaria"))
+
+            dadosBeneficiario_el = ET.SubElement(guia, "ans:dadosBeneficiario")
+            identBeneficiario_el = ET.SubElement(dadosBeneficiario_el, "ans:identBeneficiario")
+            sub(identBeneficiario_el, "numeroCartaoNacionalSaude", linha_guia.get("numeroCartaoNacionalSaude"))
+            sub(identBeneficiario_el, "cpfBeneficiario", linha_guia.get("cpfBeneficiario"))
+            sexo_val = str(linha_guia.get("sexo", "")).strip()
+            if sexo_val not in ["1", "3"] and sexo_val: # Se preenchido e inválido, TISS pode rejeitar. Ajuste conforme regra de negócio.
+                 sexo_val = "" # Ou um valor padrão, ou deixar em branco se o campo for opcional e puder ser vazio.
+            if sexo_val: # Só adiciona se tiver valor (1 ou 3)
+                 sub(identBeneficiario_el, "sexo", sexo_val)
+            sub(identBeneficiario_el, "dataNascimento", linha_guia.get("dataNascimento"), is_date=True)
+            sub(identBeneficiario_el, "municipioResidencia", linha_guia.get("municipioResidencia"))
+            sub(dadosBeneficiario_el, "numeroRegistroPlano", linha_guia.get("numeroRegistroPlano"))
+
+            sub(guia, "tipoEventoAtencao", linha_guia.get("tipoEventoAtencao"))
+            sub(guia, "origemEventoAtencao", linha_guia.get("origemEventoAtencao"))
+            sub(guia, "numeroGuia_prestador", linha_guia.get("numeroGuia_prestador"))
+            sub(guia, "numeroGuia_operadora", linha_guia.get("numeroGuia_operadora"))
+            sub(guia, "identificacaoReembolso", linha_guia.get("identificacaoReembolso"))
+            sub(guia, "identificacaoValorPreestabelecido", linha_guia.get("identificacaoValorPreestabelecido"))
+
+            # formasRemuneracao (maxOccurs="unbounded") - Adapte se houver múltiplas no Excel para a mesma guia
+            if pd.notna(linha_guia.get("formaRemuneracao")) or pd.notna(linha_guia.get("valorRemuneracao")):
+                formasRemuneracao_el = ET.SubElement(guia, "ans:formasRemuneracao")
+                sub(formasRemuneracao_el, "formaRemuneracao", linha_guia.get("formaRemuneracao"))
+                sub(formasRemuneracao_el, "valorRemuneracao", linha_guia.get("valorRemuneracao"))
+            
+            sub(guia, "guiaSolicitacaoInternacao", linha_guia.get("guiaSolicitacaoInternacao"))
+            sub(guia, "dataSolicitacao", linha_guia.get("dataSolicitacao"), is_date=True)
+            sub(guia, "numeroGuiaSPSADTPrincipal", linha_guia.get("numeroGuiaSPSADTPrincipal"))
+            sub(guia, "dataAutorizacao", linha_guia.get("dataAutorizacao"), is_date=True)
+            sub(guia, "dataRealizacao", linha_guia.get("dataRealizacao"), is_date=True)
+            sub(guia, "dataInicialFaturamento", linha_guia.get("dataInicialFaturamento"), is_date=True)
+            sub(guia, "dataFimPeriodo", linha_guia.get("dataFimPeriodo"), is_date=True)
+            sub(guia, "dataProtocoloCobranca", linha_guia.get("dataProtocoloCobranca"), is_date=True)
+            sub(guia, "dataPagamento", linha_guia.get("dataPagamento"), is_date=True)
+            sub(guia, "dataProcessamentoGuia", linha_guia.get("dataProcessamentoGuia"), is_date=True)
+            
+            sub(guia, "tipoConsulta", linha_guia.get("tipoConsulta"))
+            sub(guia, "cboExecutante", linha_guia.get("cboExecutante"))
+            sub(guia, "indicacaoRecemNato", linha_guia.get("indicacaoRecemNato"))
+            sub(guia, "indicacaoAcidente", linha_guia.get("indicacaoAcidente"))
+            sub(guia, "caraterAtendimento", linha_guia.get("caraterAtendimento"))
+            sub(guia, "tipoInternacao", linha_guia.get("tipoInternacao"))
+            sub(guia, "regimeInternacao", linha_guia.get("regimeInternacao"))
+
+            # diagnosticosCID10 (contém diagnosticoCID maxOccurs="4")
+            # Adapte se houver múltiplas colunas CID (ex: diagnosticoCID1, diagnosticoCID2) no Excel
+            cid_principal = linha_guia.get("diagnosticoCID") # Ou o nome da sua coluna principal de CID
+            if pd.notna(cid_principal):
+                diagnosticosCID10_el = ET.SubElement(guia, "ans:diagnosticosCID10")
+                sub(diagnosticosCID10_el, "diagnosticoCID", cid_principal)
+                # Exemplo para CIDs adicionais, se existirem colunas:
+                # for i in range(2, 5): # Para diagnosticoCID2, diagnosticoCID3, diagnosticoCID4
+                #     cid_adicional = linha_guia.get(f"diagnosticoCID{i}")
+                #     if pd.notna(cid_adicional):
+                #         sub(diagnosticosCID10_el, "diagnosticoCID", cid_adicional)
+            
+            sub(guia, "tipoAtendimento", linha_guia.get("tipoAtendimento"))
+            sub(guia, "regimeAtendimento", linha_guia.get("regimeAtendimento"))
+            sub(guia, "saudeOcupacional", linha_guia.get("saudeOcupacional"))
+            sub(guia, "tipoFaturamento", linha_guia.get("tipoFaturamento"))
+            sub(guia, "diariasAcompanhante", linha_guia.get("diariasAcompanhante"))
+            sub(guia, "diariasUTI", linha_guia.get("diariasUTI"))
+            sub(guia, "motivoSaida", linha_guia.get("motivoSaida"))
+
+            valoresGuia_el = ET.SubElement(guia, "ans:valoresGuia")
+            tags_valores_guia = [
+                "valorTotalInformado", "valorProcessado", "valorTotalPagoProcedimentos",
+                "valorTotalDiarias", "valorTotalTaxas", "valorTotalMateriais",
+                "valorTotalOPME", "valorTotalMedicamentos", "valorGlosaGuia",
+                "valorPagoGuia", "valorPagoFornecedores", "valorTotalTabelaPropria",
+                "valorTotalCoParticipacao"
+            ]
+            for tag_vg in tags_valores_guia:
+                sub(valoresGuia_el, tag_vg, linha_guia.get(tag_vg))
+
+            # declaracaoNascido (maxOccurs="8") - Adapte para múltiplas ocorrências
+            sub(guia, "declaracaoNascido", linha_guia.get("declaracaoNascido"))
+            # declaracaoObito (maxOccurs="8") - Adapte para múltiplas ocorrências
+            sub(guia, "declaracaoObito", linha_guia.get("declaracaoObito"))
+
+            # Loop para os procedimentos da guia
+            for posicao in range(inicio_guia, fim_guia): # Itera sobre todas as linhas do grupo (cada linha é um procedimento)
+                proc_linha = LinhaColunar(colunas, posicao)
+                procedimentos_el = ET.SubElement(guia, "ans:procedimentos")
+                
+                identProcedimento_el = ET.SubElement(procedimentos_el, "ans:identProcedimento")
+                sub(identProcedimento_el, "codigoTabela", proc_linha.get("codigoTabela"))
+                Procedimento_el = ET.SubElement(identProcedimento_el, "ans:Procedimento")
+                # No XSD é uma choice: grupoProcedimento OU codigoProcedimento. Assumindo que ambos podem estar no Excel
+                # e a lógica do 'sub' adicionará o que estiver presente. Se só um é permitido, ajuste.
+                if pd.notna(proc_linha.get("grupoProcedimento")):
+                    sub(Procedimento_el, "grupoProcedimento", proc_linha.get("grupoProcedimento"))
+                else: # Garante que ou grupo ou código seja enviado se um deles existir
+                    sub(Procedimento_el, "codigoProcedimento", proc_linha.get("codigoProcedimento"))
+                
+                # denteRegiao (complex choice) e denteFace - Adicionar lógica se usar odontologia
+                # Exemplo:
+                # if pd.notna(proc_linha.get("codDente")) or pd.notna(proc_linha.get("codRegiao")):
+                #    denteRegiao_el = ET.SubElement(procedimentos_el, "ans:denteRegiao")
+                #    if pd.notna(proc_linha.get("codDente")):
+                #        sub(denteRegiao_el, "codDente", proc_linha.get("codDente"))
+                #    else:
+                #        sub(denteRegiao_el, "codRegiao", proc_linha.get("codRegiao"))
+                # sub(procedimentos_el, "denteFace", proc_linha.get("denteFace"))
+
+                sub(procedimentos_el, "quantidadeInformada", proc_linha.get("quantidadeInformada"))
+                sub(procedimentos_el, "valorInformado", proc_linha.get("valorInformado"))
+                sub(procedimentos_el, "quantidadePaga", proc_linha.get("quantidadePaga"))
+                sub(procedimentos_el, "unidadeMedida", proc_linha.get("unidadeMedida"))
+                sub(procedimentos_el, "valorPagoProc", proc_linha.get("valorPagoProc"))
+                sub(procedimentos_el, "valorPagoFornecedor", proc_linha.get("valorPagoFornecedor"))
+                sub(procedimentos_el, "CNPJFornecedor", proc_linha.get("CNPJFornecedor")) # Adicionado conforme XSD
+                sub(procedimentos_el, "valorCoParticipacao", proc_linha.get("valorCoParticipacao"))
+                
+                # detalhePacote (maxOccurs="unbounded") - Adicionar lógica se usar pacotes
+                
+                # Campos de Operadora Intermediária DENTRO de cada procedimento (conforme seu script V2)
+                sub(procedimentos_el, "registroANSOperadoraIntermediaria", proc_linha.get("registroANSOperadoraIntermediaria"))
+                sub(procedimentos_el, "tipoAtendimentoOperadoraIntermediaria", proc_linha.get("tipoAtendimentoOperadoraIntermediaria"))
+
+        # Hash e Epílogo (fora do loop de guias, uma vez por arquivo)
+        # É importante que extrair_texto seja chamado APÓS todo o conteúdo de <cabecalho> e <Mensagem> ser construído
+        # Limpa qualquer texto ou cauda do elemento root antes de adicionar o epílogo, se necessário
+        root.text = None 
+        root.tail = None
+        
+        # A função extrair_texto precisa ser robusta para não pegar texto fora de cabecalho e mensagem
+        # Vamos assumir que ela pega apenas o conteúdo textual desses dois filhos diretos de root
+        conteudo_cabecalho = ''.join(extrair_texto(cabecalho))
+        conteudo_mensagem = ''.join(extrair_texto(mensagem))
+        conteudo_para_hash = conteudo_cabecalho + conteudo_mensagem
+        
+        hash_value = hashlib.md5(conteudo_para_hash.encode('iso-8859-1')).hexdigest()
+
+        epilogo = ET.SubElement(root, "ans:epilogo")
+        ET.SubElement(epilogo, "ans:hash").text = hash_value
+
+        # Prettify XML
+        # ET.indent(root) # Para Python 3.9+
+        xml_string = ET.tostring(root, encoding="utf-8", method="xml")
+        dom = minidom.parseString(xml_string)
+        final_pretty = dom.toprettyxml(indent="  ", encoding="iso-8859-1")
+        
+        # Limpa nome do arquivo para evitar caracteres inválidos
+        nome_base, _ = os.path.splitext(nome_arquivo)
+        nome_limpo = re.sub(r'[^a-zA-Z0-9_\-]', '_', nome_base) # Garante nome de arquivo válido
+        
+        arquivos_gerados[f"{nome_limpo}.xml"] = final_pretty
+        arquivos_gerados[f"{nome_limpo}.xte"] = final_pretty # XTE e XML com mesmo conteúdo
+
+    return arquivos_gerados
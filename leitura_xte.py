@@ -0,0 +1,241 @@
+"""Leitura de arquivos XTE (TISS Monitoramento) para DataFrame e exportação para Excel/CSV."""
+import xml.etree.ElementTree as ET
+import io
+from datetime import datetime
+
+import pandas as pd
+
+# Esta lista agora define colunas conhecidas e sua ordem preferencial no Excel.
+# Novas colunas encontradas no XTE serão adicionadas após estas.
+COLUNAS_PREFERENCIAIS_E_CONHECIDAS = [
+    'Nome da Origem', 'tipoRegistro', 'versaoTISSPrestador', 'formaEnvio', 'CNES',
+    'identificadorExecutante', 'codigoCNPJ_CPF', 'municipioExecutante', 'numeroCartaoNacionalSaude',
+    'cpfBeneficiario', 'sexo', 'dataNascimento', 'municipioResidencia', 'numeroRegistroPlano',
+    'tipoEventoAtencao', 'origemEventoAtencao', 'numeroGuia_prestador', 'numeroGuia_operadora',
+    'identificacaoReembolso', 'formaRemuneracao', 'valorRemuneracao', 'dataAutorizacao',
+    'dataRealizacao', 'dataProtocoloCobranca', 'dataPagamento', 'dataProcessamentoGuia',
+    'tipoConsulta', 'indicacaoRecemNato', 'indicacaoAcidente', 'caraterAtendimento',
+    'tipoAtendimento', 'regimeAtendimento', 'valorTotalInformado', 'valorProcessado',
+    'valorTotalPagoProcedimentos', 'valorTotalDiarias', 'valorTotalTaxas', 'valorTotalMateriais',
+    'valorTotalOPME', 'valorTotalMedicamentos', 'valorGlosaGuia', 'valorPagoGuia',
+    'valorPagoFornecedores', 'valorTotalTabelaPropria', 'valorTotalCoParticipacao',
+    'codigoTabela', 'grupoProcedimento', 'quantidadeInformada', 'codigoProcedimento',
+    'valorInformado', 'valorPagoProc', 'quantidadePaga', 'valorPagoFornecedor',
+    'valorCoParticipacao', 'unidadeMedida', 'numeroGuiaSPSADTPrincipal', 'tipoInternacao',
+    'regimeInternacao', 'diagnosticoCID', 'tipoFaturamento', 'motivoSaida', 'cboExecutante',
+    'dataFimPeriodo', 'declaracaoObito', 'declaracaoNascido', 'Idade_na_Realização',
+    # Campos de operadora intermediária da guia (se aplicável no nível da guia, senão apenas no procedimento)
+    'registroANSOperadoraIntermediaria', 
+    'tipoAtendimentoOperadoraIntermediaria',
+    # Campos de cabeçalho que são adicionados a cada linha
+    'tipoTransacao', 'numeroLote', 'competenciaLote', 'dataRegistroTransacao',
+    'horaRegistroTransacao', 'registroANS', 'versaoPadrao',
+    # Adicione outros campos explicitamente extraídos ou conhecidos do XSD aqui
+    'identificacaoValorPreestabelecido', 'guiaSolicitacaoInternacao', 'dataSolicitacao',
+    'dataInicialFaturamento', 'saudeOcupacional', 'diariasAcompanhante', 'diariasUTI',
+    'CNPJFornecedor' # Do procedimento
+]
+
+
+def parse_xte(file):
+    file.seek(0)
+    content = file.read().decode('iso-8859-1') # Guardar para possível retorno, embora não usado pelo Streamlit
+    tree = ET.ElementTree(ET.fromstring(content)) # Guardar para possível retorno
+    root = tree.getroot()
+    ns = {'ans': 'http://www.ans.gov.br/padroes/tiss/schemas'}
+    all_data = []
+    
+    cabecalho_info = {}
+    cabecalho_xml = root.find('.//ans:cabecalho', namespaces=ns) # Renomeado para evitar conflito com a função
+    if cabecalho_xml is not None:
+        identificacao = cabecalho_xml.find('ans:identificacaoTransacao', namespaces=ns)
+        if identificacao is not None:
+            cabecalho_info['tipoTransacao'] = identificacao.findtext('ans:tipoTransacao', default='', namespaces=ns)
+            cabecalho_info['numeroLote'] = identificacao.findtext('ans:numeroLote', default='', namespaces=ns)
+            cabecalho_info['competenciaLote'] = identificacao.findtext('ans:competenciaLote', default='', namespaces=ns)
+            cabecalho_info['dataRegistroTransacao'] = identificacao.findtext('ans:dataRegistroTransacao', default='', namespaces=ns)
+            cabecalho_info['horaRegistroTransacao'] = identificacao.findtext('ans:horaRegistroTransacao', default='', namespaces=ns)
+        cabecalho_info['registroANS'] = cabecalho_xml.findtext('ans:registroANS', default='', namespaces=ns)
+        cabecalho_info['versaoPadrao'] = cabecalho_xml.findtext('ans:versaoPadrao', default='', namespaces=ns)
+
+    for guia_xml in root.findall(".//ans:guiaMonitoramento", namespaces=ns): # Renomeado para evitar conflito
+        guia_data = {}
+        guia_data.update(cabecalho_info) # Adiciona info do cabeçalho a cada guia
+
+        # Extração de dados da guia:
+        # 1. Extrair explicitamente campos conhecidos e complexos da guia
+        # (Exemplos: CNES de dadosContratadoExecutante, etc. Sua lógica atual já faz parte disso de forma implícita)
+        # Para simplificar, vamos assumir que os campos mais simples são filhos diretos ou que a iteração abaixo os pegará.
+        # Seria mais robusto extrair campos conhecidos por XPATHs específicos aqui.
+        
+        # 2. Iterar para pegar todos os elementos folha com texto (incluindo os novos)
+        #    Esta forma de iteração pega todos os descendentes. Para pegar apenas filhos diretos com texto:
+        #    for elem in guia_xml:
+        #        if not list(elem) and elem.text is not None: # Se é folha e tem texto
+        #            tag_name = elem.tag.split('}')[-1]
+        #            # ... lógica de data e atribuição ...
+        
+        # Sua lógica original de iteração:
+        temp_guia_tags = {}
+        for elem in guia_xml.iter():
+            tag_full = elem.tag.split('}')[-1]
+            # Evita pegar o container da guia ou dos procedimentos novamente, ou containers complexos
+            if tag_full in ['guiaMonitoramento', 'procedimentos', 'dadosContratadoExecutante', 'dadosBeneficiario', 
+                           'identBeneficiario', 'formasRemuneracao', 'diagnosticosCID10', 'valoresGuia']:
+                continue
+
+            if elem.text is not None and not list(elem): # Apenas elementos folha com texto
+                if 'data' in tag_full.lower():
+                    try:
+                        date_obj = datetime.strptime(elem.text.strip(), '%Y-%m-%d')
+                        temp_guia_tags[tag_full] = date_obj.strftime('%d/%m/%Y')
+                    except ValueError:
+                        temp_guia_tags[tag_full] = elem.text.strip()
+                else:
+                    temp_guia_tags[tag_full] = elem.text.strip()
+        guia_data.update(temp_guia_tags) # Adiciona/sobrescreve com os valores encontrados
+
+        # Extração explícita para campos que são aninhados ou requerem lógica especial
+        # (Você já faz isso para alguns campos de procedimento)
+        # Exemplo para campos da guia que são aninhados:
+        contratado_exec_xml = guia_xml.find('.//ans:dadosContratadoExecutante', namespaces=ns)
+        if contratado_exec_xml is not None:
+            guia_data['CNES'] = contratado_exec_xml.findtext('ans:CNES', default='', namespaces=ns)
+            guia_data['identificadorExecutante'] = contratado_exec_xml.findtext('ans:identificadorExecutante', default='', namespaces=ns)
+            guia_data['codigoCNPJ_CPF'] = contratado_exec_xml.findtext('ans:codigoCNPJ_CPF', default='', namespaces=ns)
+            guia_data['municipioExecutante'] = contratado_exec_xml.findtext('ans:municipioExecutante', default='', namespaces=ns)
+        
+        benef_xml = guia_xml.find('.//ans:dadosBeneficiario', namespaces=ns)
+        if benef_xml is not None:
+            ident_benef_xml = benef_xml.find('.//ans:identBeneficiario', namespaces=ns)
+            if ident_benef_xml is not None:
+                guia_data['numeroCartaoNacionalSaude'] = ident_benef_xml.findtext('ans:numeroCartaoNacionalSaude', default='', namespaces=ns)
+                guia_data['cpfBeneficiario'] = ident_benef_xml.findtext('ans:cpfBeneficiario', default='', namespaces=ns)
+                guia_data['sexo'] = ident_benef_xml.findtext('ans:sexo', default='', namespaces=ns)
+                data_nasc_text = ident_benef_xml.findtext('ans:dataNascimento', default='', namespaces=ns)
+                try:
+                    guia_data['dataNascimento'] = datetime.strptime(data_nasc_text, '%Y-%m-%d').strftime('%d/%m/%Y') if data_nasc_text else ''
+                except ValueError:
+                    guia_data['dataNascimento'] = data_nasc_text
+                guia_data['municipioResidencia'] = ident_benef_xml.findtext('ans:municipioResidencia', default='', namespaces=ns)
+            guia_data['numeroRegistroPlano'] = benef_xml.findtext('ans:numeroRegistroPlano', default='', namespaces=ns)
+
+
+        procedimentos_xml_list = guia_xml.findall(".//ans:procedimentos", namespaces=ns)
+        if procedimentos_xml_list:
+            for proc_xml in procedimentos_xml_list: # Renomeado para evitar conflito
+                proc_data = guia_data.copy() # Herda todos os dados da guia, incluindo os "novos"
+
+                # Extração explícita de campos conhecidos do procedimento
+                proc_data['codigoTabela'] = (proc_xml.findtext('ans:identProcedimento/ans:codigoTabela', namespaces=ns) or '').strip()
+                proc_data['grupoProcedimento'] = (proc_xml.findtext('ans:identProcedimento/ans:Procedimento/ans:grupoProcedimento', namespaces=ns) or '').strip()
+                proc_data['codigoProcedimento'] = (proc_xml.findtext('ans:identProcedimento/ans:Procedimento/ans:codigoProcedimento', namespaces=ns) or '').strip()
+                proc_data['quantidadeInformada'] = (proc_xml.findtext('ans:quantidadeInformada', namespaces=ns) or '').strip()
+                proc_data['valorInformado'] = (proc_xml.findtext('ans:valorInformado', namespaces=ns) or '').strip()
+                proc_data['quantidadePaga'] = (proc_xml.findtext('ans:quantidadePaga', namespaces=ns) or '').strip()
+                proc_data['unidadeMedida'] = (proc_xml.findtext('ans:unidadeMedida', namespaces=ns) or '').strip()
+                proc_data['valorPagoProc'] = (proc_xml.findtext('ans:valorPagoProc', namespaces=ns) or '').strip()
+                proc_data['valorPagoFornecedor'] = (proc_xml.findtext('ans:valorPagoFornecedor', namespaces=ns) or '').strip()
+                proc_data['CNPJFornecedor'] = (proc_xml.findtext('ans:CNPJFornecedor', namespaces=ns) or '').strip() # Adicionado
+                proc_data['valorCoParticipacao'] = (proc_xml.findtext('ans:valorCoParticipacao', namespaces=ns) or '').strip()
+                
+                # Campos de operadora intermediária específicos do procedimento (podem ter nomes diferentes das da guia)
+                proc_data['registroANSOperadoraIntermediaria_proc'] = (proc_xml.findtext('ans:registroANSOperadoraIntermediaria', namespaces=ns) or '').strip()
+                proc_data['tipoAtendimentoOperadoraIntermediaria_proc'] = (proc_xml.findtext('ans:tipoAtendimentoOperadoraIntermediaria', namespaces=ns) or '').strip()
+
+                # Lógica para pegar outras tags simples ("novas") dentro do procedimento
+                temp_proc_tags = {}
+                for sub_elem_proc in proc_xml.iter():
+                    tag_full_proc = sub_elem_proc.tag.split('}')[-1]
+                    if tag_full_proc in ['procedimentos', 'identProcedimento', 'Procedimento', 'denteRegiao', 'detalhePacote']: # Evitar containers
+                        continue
+                    # Evitar sobrescrever o que já foi pego explicitamente ou herdado da guia se o nome for igual
+                    if sub_elem_proc.text is not None and not list(sub_elem_proc) and tag_full_proc not in proc_data: 
+                        temp_proc_tags[tag_full_proc] = sub_elem_proc.text.strip()
+                proc_data.update(temp_proc_tags)
+                all_data.append(proc_data)
+        else:
+            all_data.append(guia_data)
+
+    df = pd.DataFrame(all_data)
+    
+    # Adicionar 'Nome da Origem' se ainda não existir (deve existir se file.name for válido)
+    if 'Nome da Origem' not in df.columns and hasattr(file, 'name'):
+        df['Nome da Origem'] = file.name
+    elif hasattr(file, 'name'): # Garante que o valor correto seja usado se o iter() pegou algo chamado 'Nome da Origem'
+         df['Nome da Origem'] = file.name
+
+
+    # --- INÍCIO DA LÓGICA DE ORDENAÇÃO E MANUTENÇÃO DE NOVAS COLUNAS ---
+    final_ordered_columns = []
+    # Adiciona colunas preferenciais e conhecidas primeiro, se existirem no DataFrame
+    for col_pref in COLUNAS_PREFERENCIAIS_E_CONHECIDAS:
+        if col_pref in df.columns:
+            final_ordered_columns.append(col_pref)
+            
+    # Adiciona quaisquer outras colunas (novas) que foram parseadas mas não estavam na lista preferencial
+    for col_df in df.columns:
+        if col_df not in final_ordered_columns:
+            final_ordered_columns.append(col_df)
+            
+    df = df[final_ordered_columns] # Reordena o DataFrame
+    # --- FIM DA LÓGICA DE ORDENAÇÃO ---
+
+    # Formatação de datas (após todas as colunas estarem no lugar)
+    for col in df.columns: # Itera sobre todas as colunas presentes
+        if 'data' in col.lower() and col not in ['Idade_na_Realização'] and df[col].notna().any():
+            # Tenta converter para DD/MM/YYYY apenas se houver algum valor não nulo
+            # e se a coluna parece ser uma data (contém 'data' no nome)
+            try:
+                # Converte para datetime (pandas infere o formato) e depois para string DD/MM/YYYY
+                # Se já for string no formato DD/MM/YYYY ou YYYY-MM-DD, to_datetime pode lidar com isso.
+                df[col] = pd.to_datetime(df[col], errors='coerce', dayfirst=True).dt.strftime('%d/%m/%Y')
+            except Exception as e:
+                # Se a conversão falhar (ex: coluna contém texto não datável), mantém original
+                # print(f"Não foi possível converter a coluna de data '{col}': {e}")
+                pass
+    
+    # Calcular idade
+    if 'dataRealizacao' in df.columns and 'dataNascimento' in df.columns:
+        def calcular_idade(row):
+            try:
+                # As datas já devem estar como string DD/MM/YYYY ou NaT/NaN do passo anterior
+                data_realizacao_str = row['dataRealizacao']
+                data_nascimento_str = row['dataNascimento']
+                
+                if pd.isna(data_realizacao_str) or pd.isna(data_nascimento_str):
+                    return None
+                    
+                data_realizacao = datetime.strptime(str(data_realizacao_str), '%d/%m/%Y')
+                data_nascimento = datetime.strptime(str(data_nascimento_str), '%d/%m/%Y')
+                return (data_realizacao - data_nascimento).days // 365
+            except Exception:
+                return None
+        df['Idade_na_Realização'] = df.apply(calcular_idade, axis=1)
+
+    # Corrigir campos com zeros à esquerda
+    for col_zero in ['numeroGuia_prestador', 'numeroGuia_operadora', 'identificacaoReembolso']:
+        if col_zero in df.columns:
+            df[col_zero] = df[col_zero].apply(lambda x: str(int(x)) if pd.notna(x) and isinstance(x, str) and x.isdigit() else x)
+            
+    # Retorna apenas o DataFrame, pois 'content' e 'tree' não são usados pela interface Streamlit
+    return df # , content, tree
+
+
+def remove_duplicate_columns(df):
+    df = df.loc[:, ~df.columns.duplicated()]
+    df = df.dropna(axis=1, how='all')
+    return df
+
+
+def exportar_excel(df):
+    # O writer (openpyxl/XlsxWriter) só é importado pelo pandas aqui, no momento da exportação
+    excel_buffer = io.BytesIO()
+    df.to_excel(excel_buffer, index=False)
+    return excel_buffer.getvalue()
+
+
+def exportar_csv(df):
+    csv_buffer = io.StringIO()
+    df.to_csv(csv_buffer, index=False, sep=";", encoding="utf-8", float_format='%.2f')
+    return csv_buffer.getvalue()